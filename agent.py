@@ -1,4 +1,9 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 
 url = "https://mellowmark27.github.io/Fundscope/"
@@ -6,8 +11,29 @@ headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
-response = requests.get(url, headers=headers)
-print(f"Status: {response.status_code}")
-if response.status_code == 200:
-    soup = BeautifulSoup(response.text, 'html.parser')
-    # Your scraping logic here
+# One keep-alive session shared by every fetch so TCP/TLS setup is paid once
+session = requests.Session()
+session.headers.update(headers)
+session.headers["Accept-Encoding"] = "gzip"
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                      max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# Cap on simultaneous requests to the same site, independent of pool size
+_polite = threading.Semaphore(8)
+
+def fetch(u):
+    with _polite:
+        return session.get(u)
+
+def fetch_all(urls, max_workers=16):
+    """Fetch URLs concurrently over the shared session; results keep input order."""
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(fetch, urls))
+
+if __name__ == "__main__":
+    response = session.get(url)
+    print(f"Status: {response.status_code}")
+    if response.status_code == 200:
+        # lxml's C parser, fed raw bytes so it sniffs the encoding itself
+        soup = BeautifulSoup(response.content, 'lxml')
+        # Your scraping logic here
@@ -1,52 +1,190 @@
 """backend/db.py — Database connection manager."""
-import os, sqlite3, logging
+import os, copy, sqlite3, logging, threading
+from hashlib import blake2b
 from pathlib import Path
 from contextlib import contextmanager
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader   # libyaml C parser
+except ImportError:                              # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    import msgpack                               # optional: on-disk parse snapshots
+except ImportError:
+    msgpack = None
+
 logger = logging.getLogger(__name__)
 CONFIG_PATH = Path(__file__).parent.parent / "config" / "sectors.yaml"
 
-def load_config():
-    with open(CONFIG_PATH) as f:
-        return yaml.safe_load(f)
+# path -> (mtime, size, parsed) so callers only re-parse when the file changes
+_YAML_CACHE: dict[str, tuple[float, int, dict]] = {}
+
+def _parse_yaml(path: str) -> dict:
+    """
+    Parse YAML, via a `<path>.<content hash>.msgpack` snapshot when msgpack is
+    installed, so fresh processes (each pipeline run) skip the YAML parser.
+    """
+    raw = Path(path).read_bytes()
+    if msgpack is None:
+        return yaml.load(raw, Loader=_YamlLoader)
+    snap = Path(f"{path}.{blake2b(raw, digest_size=8).hexdigest()}.msgpack")
+    try:
+        return msgpack.unpackb(snap.read_bytes(), strict_map_key=False)
+    except (OSError, ValueError, msgpack.UnpackException):
+        pass
+    data = yaml.load(raw, Loader=_YamlLoader)
+    try:
+        tmp = snap.with_name(f"{snap.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(msgpack.packb(data))
+        os.replace(tmp, snap)
+        for old in snap.parent.glob(f"{Path(path).name}.*.msgpack"):
+            if old != snap:
+                old.unlink(missing_ok=True)
+    except (OSError, TypeError) as e:   # read-only dir, or values msgpack can't encode
+        logger.debug(f"No msgpack snapshot for {path}: {e}")
+    return data
+
+def load_yaml(path, shared: bool = False) -> dict:
+    """Parse a YAML file, reusing the cached result while its mtime/size are unchanged.
+
+    Returns a deep copy so callers can mutate it (e.g. before save_config) safely.
+    Read-only callers may pass shared=True to get the cached object itself.
+    """
+    key = str(path)
+    st = os.stat(key)
+    hit = _YAML_CACHE.get(key)
+    if hit is None or hit[0] != st.st_mtime or hit[1] != st.st_size:
+        hit = _YAML_CACHE[key] = (st.st_mtime, st.st_size, _parse_yaml(key))
+    return hit[2] if shared else copy.deepcopy(hit[2])
+
+def invalidate_yaml(path=None):
+    """Drop the cached parse for `path` (or every file when omitted)."""
+    if path is None:
+        _YAML_CACHE.clear()
+    else:
+        _YAML_CACHE.pop(str(path), None)
+
+def load_config(shared: bool = False):
+    return load_yaml(CONFIG_PATH, shared)
+
+# (cfg, sector_map, monitored) derived from the shared config object; rebuilt
+# only when load_yaml hands back a fresh parse.
+_SECTOR_VIEWS: tuple = (None, {}, [])
+
+def load_sectors() -> tuple[dict, dict[str, str], list[dict]]:
+    """Shared config plus its {code: name} map and monitored sectors. Read-only."""
+    global _SECTOR_VIEWS
+    cfg = load_config(shared=True)
+    if _SECTOR_VIEWS[0] is not cfg:
+        sectors = cfg["sectors"]
+        _SECTOR_VIEWS = (cfg, {s["code"]: s["name"] for s in sectors},
+                         [s for s in sectors if s.get("monitored")])
+    return _SECTOR_VIEWS
 
 def get_sqlite_path():
-    cfg = load_config()
+    cfg = load_config(shared=True)
     return os.environ.get("SQLITE_PATH", cfg["database"].get("sqlite_path", "./fundscope.db"))
 
-def init_db(db_path=None):
-    path = db_path or get_sqlite_path()
-    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+# Schema/seed is applied once per database path per process.
+_SCHEMA_READY: set[str] = set()
+_SCHEMA_LOCK = threading.Lock()
+# sqlite3 connections are not thread-safe, so each worker thread keeps its own,
+# keyed by (thread ident, path).
+_POOL: dict[tuple[int, str], sqlite3.Connection] = {}
+_POOL_LOCK = threading.Lock()
+
+def open_connection(path, bulk: bool = False):
+    # Pooled connections are only used by the thread that opened them, but
+    # close_pool() may run elsewhere, hence check_same_thread=False.
+    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES,
+                           check_same_thread=False, cached_statements=256)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL skips the fsync on every WAL commit; a power loss can drop the last
+    # few transactions but never corrupts the file. Acceptable because the
+    # pipeline is idempotent and simply re-run for that week.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    if bulk:
+        # Pipeline writer only: the API pools a connection per worker thread,
+        # which keep SQLite's default cache and no mmap
+        conn.execute("PRAGMA cache_size=-65536")      # 64MB page cache
+        conn.execute("PRAGMA mmap_size=268435456")    # 256MB
     conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+# Supporting indexes for the API's hot ranking/alert queries, on top of those
+# declared in schema.sql.
+HOT_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_perf_week_return6m ON fund_performance(week_date, return_6m DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_week_streak ON alert_history(week_date DESC, streak_broken DESC);
+CREATE INDEX IF NOT EXISTS idx_funds_sector_active ON funds(sector_code, active);
+"""
+
+def ensure_schema(conn):
     schema = (Path(__file__).parent / "schema.sql").read_text()
     conn.executescript(schema)
+    conn.executescript(HOT_INDEXES)
     # Seed sectors from config
-    cfg = load_config()
+    cfg = load_config(shared=True)
     for s in cfg.get("sectors", []):
         conn.execute("""
             INSERT OR IGNORE INTO sectors (sector_code, sector_name, monitored)
             VALUES (?, ?, ?)
         """, (s["code"], s["name"], 1 if s.get("monitored") else 0))
     conn.commit()
+
+def prepare_db(db_path=None):
+    """Create the schema and seed sectors, once per process for this path."""
+    path = db_path or get_sqlite_path()
+    with _SCHEMA_LOCK:
+        if path in _SCHEMA_READY:
+            return
+        conn = open_connection(path, bulk=True)
+        try:
+            ensure_schema(conn)
+        finally:
+            conn.close()
+        _SCHEMA_READY.add(path)
+
+def init_db(db_path=None):
+    """Open a fresh connection, (re)applying the schema and sector seed."""
+    path = db_path or get_sqlite_path()
+    conn = open_connection(path, bulk=True)
+    try:
+        ensure_schema(conn)
+    except Exception:
+        conn.close()
+        raise
+    with _SCHEMA_LOCK:
+        _SCHEMA_READY.add(path)
+    return conn
+
+def _lease(path):
+    key = (threading.get_ident(), path)
+    conn = _POOL.get(key)
+    if conn is None:
+        prepare_db(path)
+        conn = open_connection(path)
+        with _POOL_LOCK:
+            _POOL[key] = conn
     return conn
 
+def close_pool():
+    """Close every pooled connection (call on app shutdown)."""
+    with _POOL_LOCK:
+        for conn in _POOL.values():
+            conn.close()
+        _POOL.clear()
+
 @contextmanager
 def get_db(db_path=None):
-    conn = init_db(db_path)
+    conn = _lease(db_path or get_sqlite_path())
     try:
         yield conn
         conn.commit()
     except Exception:
         conn.rollback()
         raise
-    finally:
-        conn.close()
-
-def row_to_dict(row):
-    return dict(row) if row else {}
-
-def rows_to_dicts(rows):
-    return [dict(r) for r in rows]
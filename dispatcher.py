@@ -9,23 +9,23 @@ import os
 import logging
 import smtplib
 from datetime import date
+from operator import itemgetter
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from pathlib import Path
 from typing import Optional
 
 from jinja2 import Environment, FileSystemLoader
-import yaml
+
+from backend.db import load_config
 
 logger = logging.getLogger(__name__)
 
-CONFIG_PATH = Path(__file__).parent.parent.parent / "config" / "sectors.yaml"
 TEMPLATE_DIR = Path(__file__).parent
 
-
-def load_config() -> dict:
-    with open(CONFIG_PATH) as f:
-        return yaml.safe_load(f)
+# Compiled once at import and reused for every digest.
+_ENV = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)), auto_reload=False, cache_size=50)
+_TEMPLATE = _ENV.get_template("digest_template.html")
 
 
 # ── Template rendering ─────────────────────────────────────────────────────────
@@ -34,29 +34,38 @@ def build_alert_list(raw_alerts: list[dict], fund_names: dict[str, str], sector_
     """
     Group raw alerts by fund so each fund appears once with all its period drops.
     """
-    from collections import defaultdict
-    grouped = defaultdict(lambda: {"drops": [], "streak_broken": 0})
+    grouped = {}
+    # Bound-method aliases keep attribute lookups out of the per-alert loop
+    fn_get, sn_get, g_get = fund_names.get, sector_names.get, grouped.get
 
     for a in raw_alerts:
         fid = a["fund_id"]
-        grouped[fid]["fund_id"]     = fid
-        grouped[fid]["fund_name"]   = fund_names.get(fid, fid)
-        grouped[fid]["sector_name"] = sector_names.get(a["sector_code"], a["sector_code"])
-        grouped[fid]["sector_code"] = a["sector_code"]
+        streak = a.get("streak_broken", 0)
+        g = g_get(fid)
+        if g is None:
+            sc = a["sector_code"]
+            g = grouped[fid] = {
+                "fund_id":       fid,
+                "fund_name":     fn_get(fid, fid),
+                "sector_name":   sn_get(sc, sc),
+                "sector_code":   sc,
+                "streak_broken": streak,
+                "drops":         [],
+            }
         # Use longest streak broken across periods
-        if a.get("streak_broken", 0) > grouped[fid]["streak_broken"]:
-            grouped[fid]["streak_broken"] = a.get("streak_broken", 0)
-        grouped[fid]["drops"].append({
+        elif streak > g["streak_broken"]:
+            g["streak_broken"] = streak
+        g["drops"].append({
             "period":       a["period"],
             "prev_decile":  a.get("prev_decile", 1),
             "curr_decile":  a.get("curr_decile", 2),
             "return_value": a.get("return_value", 0.0),
         })
 
-    return sorted(grouped.values(), key=lambda x: -x["streak_broken"])
+    return sorted(grouped.values(), key=itemgetter("streak_broken"), reverse=True)
 
 
-def render_digest(
+def digest_context(
     week_date: date,
     alerts: list[dict],
     top3_by_sector: dict[str, list[dict]],
@@ -64,17 +73,14 @@ def render_digest(
     sector_names: dict[str, str],
     failed_sectors: list[str],
     total_funds: int,
-) -> str:
-    """Render the HTML email digest from the Jinja2 template."""
-    env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)))
-    template = env.get_template("digest_template.html")
-
+) -> dict:
+    """Build the template context for the weekly digest."""
     structured_alerts = build_alert_list(alerts, fund_names, sector_names)
     drop_count = len(structured_alerts)
     top3_count = sum(len(v) for v in top3_by_sector.values())
     sector_count = len([v for v in top3_by_sector.values() if v])
 
-    context = {
+    return {
         "week_date":         week_date.isoformat(),
         "week_date_display": week_date.strftime("%-d %B %Y"),
         "drop_count":        drop_count,
@@ -85,14 +91,48 @@ def render_digest(
         "top3_by_sector":    top3_by_sector,
         "failed_sectors":    failed_sectors,
     }
-    return template.render(**context)
 
 
-def build_subject(drop_count: int, week_date: date, cfg: dict) -> str:
-    template = cfg["alerts"].get(
-        "subject_template",
-        "FundScope Weekly — {drop_count} Decile Drop{plural} · w/e {week_date}"
+def render_digest(
+    week_date: date,
+    alerts: list[dict],
+    top3_by_sector: dict[str, list[dict]],
+    fund_names: dict[str, str],
+    sector_names: dict[str, str],
+    failed_sectors: list[str],
+    total_funds: int,
+) -> str:
+    """Render the HTML email digest from the Jinja2 template."""
+    context = digest_context(
+        week_date, alerts, top3_by_sector, fund_names,
+        sector_names, failed_sectors, total_funds
+    )
+    return _TEMPLATE.render(**context)
+
+
+def write_digest(
+    path,
+    week_date: date,
+    alerts: list[dict],
+    top3_by_sector: dict[str, list[dict]],
+    fund_names: dict[str, str],
+    sector_names: dict[str, str],
+    failed_sectors: list[str],
+    total_funds: int,
+) -> None:
+    """Stream the rendered digest straight to `path` without building one big string."""
+    context = digest_context(
+        week_date, alerts, top3_by_sector, fund_names,
+        sector_names, failed_sectors, total_funds
     )
+    _TEMPLATE.stream(**context).dump(str(path), encoding="utf-8")
+
+
+DEFAULT_SUBJECT_TEMPLATE = "FundScope Weekly — {drop_count} Decile Drop{plural} · w/e {week_date}"
+
+
+def build_subject(drop_count: int, week_date: date, cfg: dict) -> str:
+    template = cfg["alerts"].get("subject_template", DEFAULT_SUBJECT_TEMPLATE)
     return template.format(
         drop_count=drop_count,
         plural="s" if drop_count != 1 else "",
@@ -195,7 +235,7 @@ def dispatch_digest(
     Main entry point — renders and sends the weekly digest email.
     Returns True on success, False on failure.
     """
-    cfg = load_config()
+    cfg = load_config(shared=True)
     alert_cfg = cfg.get("alerts", {})
     recipients = alert_cfg.get("recipients", [])
 
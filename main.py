@@ -15,32 +15,56 @@ Key endpoints:
   POST /api/pipeline/run                   Trigger pipeline (mock or live)
 """
 
-import sys, os
+import sys, os, sqlite3
+from contextlib import asynccontextmanager
 from pathlib import Path
 from datetime import date
 from typing import Optional, List
 import yaml
+import orjson
 
 from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
+from starlette.responses import Response
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from backend.db import get_db, rows_to_dicts, init_db
+from backend.db import get_db, init_db, load_config, invalidate_yaml, prepare_db, close_pool
 
 CONFIG_PATH = Path(__file__).parent.parent.parent / "config" / "sectors.yaml"
 
-def load_config():
-    with open(CONFIG_PATH) as f:
-        return yaml.safe_load(f)
-
 def save_config(cfg: dict):
     with open(CONFIG_PATH, "w") as f:
         yaml.dump(cfg, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    invalidate_yaml(CONFIG_PATH)
+
+def _orjson_default(obj):
+    if isinstance(obj, sqlite3.Row):
+        return dict(zip(obj.keys(), obj))
+    raise TypeError
+
+class RowsResponse(Response):
+    """orjson response that serialises sqlite3.Row objects directly.
+
+    Returning a Response skips FastAPI's jsonable_encoder pass, so query results
+    go straight from the cursor to bytes without a dict copy per row.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_orjson_default)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema + sector seed once per process; requests then reuse pooled connections.
+    prepare_db()
+    yield
+    close_pool()
 
-app = FastAPI(title="FundScope API", description="IA Unit Trust & OEIC Monitor", version="2.0.0")
+app = FastAPI(title="FundScope API", description="IA Unit Trust & OEIC Monitor", version="2.0.0",
+              lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 # Serve frontend
@@ -48,10 +72,6 @@ FRONTEND_DIR = Path(__file__).parent.parent.parent / "frontend"
 if FRONTEND_DIR.exists():
     app.mount("/static", StaticFiles(directory=str(FRONTEND_DIR)), name="static")
 
-def latest_week_date(conn) -> Optional[str]:
-    row = conn.execute("SELECT MAX(week_date) as wd FROM fund_performance").fetchone()
-    return dict(row).get("wd") if row else None
-
 # ── Sectors ───────────────────────────────────────────────────────────────────
 
 @app.get("/api/sectors")
@@ -66,7 +86,7 @@ def get_sectors():
             GROUP BY s.sector_code
             ORDER BY s.sector_name
         """).fetchall()
-        return rows_to_dicts(rows)
+        return RowsResponse(rows)
 
 class SectorToggle(BaseModel):
     monitored: bool
@@ -75,17 +95,14 @@ class SectorToggle(BaseModel):
 def toggle_sector(sector_code: str, body: SectorToggle):
     """Toggle monitoring on/off for a specific IA sector."""
     with get_db() as conn:
-        conn.execute(
+        updated = conn.execute(
             "UPDATE sectors SET monitored = ? WHERE sector_code = ?",
             (1 if body.monitored else 0, sector_code)
-        )
-        updated = conn.execute(
-            "SELECT * FROM sectors WHERE sector_code = ?", (sector_code,)
-        ).fetchone()
-        if not updated:
-            raise HTTPException(404, f"Sector '{sector_code}' not found")
+        ).rowcount
+    if not updated:
+        raise HTTPException(404, f"Sector '{sector_code}' not found")
 
-    # Also update config yaml so it persists
+    # Also update config yaml so it persists (after the DB transaction has committed)
     cfg = load_config()
     for s in cfg.get("sectors", []):
         if s["code"] == sector_code:
@@ -103,9 +120,11 @@ def set_monitored_sectors(body: BatchSectors):
     cfg = load_config()
     enabled = set(body.sector_codes)
     with get_db() as conn:
-        conn.execute("UPDATE sectors SET monitored = 0")
-        for code in enabled:
-            conn.execute("UPDATE sectors SET monitored = 1 WHERE sector_code = ?", (code,))
+        placeholders = ",".join("?" * len(enabled))
+        conn.execute(f"""
+            UPDATE sectors
+            SET monitored = CASE WHEN sector_code IN ({placeholders}) THEN 1 ELSE 0 END
+        """, tuple(enabled))
     for s in cfg.get("sectors", []):
         s["monitored"] = s["code"] in enabled
     save_config(cfg)
@@ -117,10 +136,6 @@ def get_sector_rankings(sector_code: str,
                         period: str = Query("6m"),
                         limit: int = Query(200)):
     with get_db() as conn:
-        if not week_date:
-            week_date = latest_week_date(conn)
-        if not week_date:
-            return []
         period_col = f"return_{period}"
         rows = conn.execute(f"""
             SELECT f.fund_id, f.fund_name, f.isin, f.fund_group,
@@ -133,32 +148,28 @@ def get_sector_rankings(sector_code: str,
             FROM fund_rankings r
             JOIN funds f ON f.fund_id = r.fund_id
             JOIN fund_performance p ON p.fund_id = r.fund_id AND p.week_date = r.week_date
-            WHERE r.sector_code = ? AND r.week_date = ?
+            WHERE r.sector_code = ?
+              AND r.week_date = COALESCE(?, (SELECT MAX(week_date) FROM fund_performance))
             ORDER BY p.{period_col} DESC NULLS LAST
             LIMIT ?
         """, (sector_code, week_date, limit)).fetchall()
-        return rows_to_dicts(rows)
+        return RowsResponse(rows)
 
 @app.get("/api/sectors/{sector_code:path}/top3")
 def get_sector_top3(sector_code: str, week_date: Optional[str] = None):
     with get_db() as conn:
-        if not week_date:
-            week_date = latest_week_date(conn)
-        if not week_date:
-            return []
         rows = conn.execute("""
             SELECT f.fund_id, f.fund_name, f.fund_group,
-                   p.return_6m, p.return_3m, p.return_1m, r.decile_6m, r.streak_6m
+                   p.return_6m, p.return_3m, p.return_1m, r.decile_6m, r.streak_6m,
+                   ROW_NUMBER() OVER (ORDER BY p.return_6m DESC) AS rank
             FROM fund_performance p
             JOIN funds f ON f.fund_id = p.fund_id
             JOIN fund_rankings r ON r.fund_id = p.fund_id AND r.week_date = p.week_date
-            WHERE p.week_date = ? AND f.sector_code = ? AND p.return_6m IS NOT NULL
-            ORDER BY p.return_6m DESC LIMIT 3
+            WHERE p.week_date = COALESCE(?, (SELECT MAX(week_date) FROM fund_performance))
+              AND f.sector_code = ? AND p.return_6m IS NOT NULL
+            ORDER BY rank LIMIT 3
         """, (week_date, sector_code)).fetchall()
-        result = rows_to_dicts(rows)
-        for i, r in enumerate(result):
-            r["rank"] = i + 1
-        return result
+        return RowsResponse(rows)
 
 # ── Funds ─────────────────────────────────────────────────────────────────────
 
@@ -169,11 +180,13 @@ def search_funds(q: str = Query(..., min_length=2), limit: int = 20):
             SELECT fund_id, fund_name, isin, sector_code, fund_group, active
             FROM funds WHERE fund_name LIKE ? AND active=1 ORDER BY fund_name LIMIT ?
         """, (f"%{q}%", limit)).fetchall()
-        return rows_to_dicts(rows)
+        return RowsResponse(rows)
 
 @app.get("/api/funds/{fund_id}")
 def get_fund(fund_id: str, weeks: int = 52):
     with get_db() as conn:
+        # Run the three reads in one transaction: one shared lock and a consistent snapshot
+        conn.execute("BEGIN DEFERRED")
         fund = conn.execute("SELECT * FROM funds WHERE fund_id=?", (fund_id,)).fetchone()
         if not fund:
             raise HTTPException(404, "Fund not found")
@@ -189,7 +202,7 @@ def get_fund(fund_id: str, weeks: int = 52):
         alerts = conn.execute("""
             SELECT * FROM alert_history WHERE fund_id=? ORDER BY week_date DESC LIMIT 20
         """, (fund_id,)).fetchall()
-        return {"fund": dict(fund), "history": rows_to_dicts(history), "alerts": rows_to_dicts(alerts)}
+        return RowsResponse({"fund": fund, "history": history, "alerts": alerts})
 
 # ── Alerts ────────────────────────────────────────────────────────────────────
 
@@ -197,55 +210,49 @@ def get_fund(fund_id: str, weeks: int = 52):
 def get_alerts(limit: int = 100, offset: int = 0,
                sector_code: Optional[str] = None, period: Optional[str] = None):
     with get_db() as conn:
-        conds, params = [], []
-        if sector_code:
-            conds.append("a.sector_code = ?"); params.append(sector_code)
-        if period:
-            conds.append("a.period = ?"); params.append(period)
-        where = ("WHERE " + " AND ".join(conds)) if conds else ""
-        rows = conn.execute(f"""
+        # Fixed statement text so sqlite3's statement cache reuses one prepared plan
+        rows = conn.execute("""
             SELECT a.*, f.fund_name, s.sector_name
             FROM alert_history a
             JOIN funds f ON f.fund_id = a.fund_id
             JOIN sectors s ON s.sector_code = a.sector_code
-            {where}
+            WHERE (?1 IS NULL OR a.sector_code = ?1)
+              AND (?2 IS NULL OR a.period = ?2)
             ORDER BY a.week_date DESC, a.streak_broken DESC
-            LIMIT ? OFFSET ?
-        """, params + [limit, offset]).fetchall()
-        return rows_to_dicts(rows)
+            LIMIT ?3 OFFSET ?4
+        """, (sector_code or None, period or None, limit, offset)).fetchall()
+        return RowsResponse(rows)
 
 @app.get("/api/alerts/latest")
 def get_latest_alerts():
     with get_db() as conn:
-        wd = latest_week_date(conn)
-        if not wd:
-            return []
         rows = conn.execute("""
             SELECT a.*, f.fund_name, s.sector_name
             FROM alert_history a
             JOIN funds f ON f.fund_id=a.fund_id
             JOIN sectors s ON s.sector_code=a.sector_code
-            WHERE a.week_date=? ORDER BY a.streak_broken DESC
-        """, (wd,)).fetchall()
-        return rows_to_dicts(rows)
+            WHERE a.week_date=(SELECT MAX(week_date) FROM fund_performance)
+            ORDER BY a.streak_broken DESC
+        """).fetchall()
+        return RowsResponse(rows)
 
 # ── Summary ───────────────────────────────────────────────────────────────────
 
 @app.get("/api/summary")
 def get_summary():
     with get_db() as conn:
-        wd = latest_week_date(conn)
-        def n(q, *p):
-            r = conn.execute(q, p).fetchone()
-            return list(dict(r).values())[0] if r else 0
-        return {
-            "week_date":          wd,
-            "total_funds":        n("SELECT COUNT(DISTINCT fund_id) FROM funds WHERE active=1"),
-            "monitored_sectors":  n("SELECT COUNT(*) FROM sectors WHERE monitored=1"),
-            "total_sectors":      n("SELECT COUNT(*) FROM sectors"),
-            "alerts_this_week":   n("SELECT COUNT(*) FROM alert_history WHERE week_date=?", wd) if wd else 0,
-            "total_alerts_ever":  n("SELECT COUNT(*) FROM alert_history"),
-        }
+        row = conn.execute("""
+            WITH latest AS (SELECT MAX(week_date) AS wd FROM fund_performance)
+            SELECT
+                (SELECT wd FROM latest)                                        AS week_date,
+                (SELECT COUNT(DISTINCT fund_id) FROM funds WHERE active=1)     AS total_funds,
+                (SELECT COUNT(*) FROM sectors WHERE monitored=1)               AS monitored_sectors,
+                (SELECT COUNT(*) FROM sectors)                                 AS total_sectors,
+                (SELECT COUNT(*) FROM alert_history
+                 WHERE week_date=(SELECT wd FROM latest))                      AS alerts_this_week,
+                (SELECT COUNT(*) FROM alert_history)                           AS total_alerts_ever
+        """).fetchone()
+        return RowsResponse(row)
 
 @app.get("/api/pipeline/status")
 def pipeline_status(limit: int = 30):
@@ -253,7 +260,7 @@ def pipeline_status(limit: int = 30):
         rows = conn.execute("""
             SELECT * FROM pipeline_log ORDER BY created_at DESC LIMIT ?
         """, (limit,)).fetchall()
-        return rows_to_dicts(rows)
+        return RowsResponse(rows)
 
 # ── Pipeline trigger ──────────────────────────────────────────────────────────
 
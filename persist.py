@@ -2,72 +2,110 @@
 fundscope/backend/engine/persist.py
 
 Database persistence layer — writes scraped performance data and rankings to DB.
+
+Writers don't commit: the caller owns the transaction, so a whole pipeline run
+can share one connection and commit once.
 """
 
 import logging
+import sqlite3
+from collections import defaultdict
 from datetime import date
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 
+FUND_COLS = ("fund_id", "fund_name", "isin", "sedol", "sector_code", "fund_group")
+
+UPSERT_FUND_SQL = """
+    INSERT INTO funds (fund_id, fund_name, isin, sedol, sector_code, fund_group, active, first_seen, last_seen)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, 1, ?7, ?7)
+    ON CONFLICT(fund_id) DO UPDATE SET
+        fund_name = excluded.fund_name,
+        last_seen = excluded.last_seen,
+        active = 1,
+        fund_group = COALESCE(excluded.fund_group, fund_group)
+"""
+
+
 def upsert_funds(conn, performances: list[dict], week_date: date):
     """Insert or update fund records in the funds table."""
     today = week_date.isoformat()
-    for p in performances:
-        conn.execute("""
-            INSERT INTO funds (fund_id, fund_name, isin, sector_code, active, first_seen, last_seen)
-            VALUES (:fund_id, :fund_name, :isin, :sector_code, 1, :today, :today)
-            ON CONFLICT(fund_id) DO UPDATE SET
-                fund_name = excluded.fund_name,
-                last_seen = :today,
-                active = 1
-        """, {**p, "today": today})
+    pick = itemgetter(*FUND_COLS)
+    # Positional tuples streamed straight into executemany — no per-row dict copy
+    conn.executemany(UPSERT_FUND_SQL, ((*pick(p), today) for p in performances))
+
+
+PERFORMANCE_COLS = ("fund_id", "week_date", "return_1m", "return_3m", "return_6m", "return_1y")
+
+RANKING_COLS = ("fund_id", "sector_code", "week_date",
+                "decile_1m", "decile_3m", "decile_6m",
+                "quartile_1m", "quartile_3m", "quartile_6m",
+                "rank_1m", "rank_3m", "rank_6m",
+                "total_in_sector",
+                "streak_1m", "streak_3m", "streak_6m")
+
+ALERT_COLS = ("fund_id", "sector_code", "week_date", "alert_type", "period",
+              "prev_decile", "curr_decile", "streak_broken", "return_value")
+
+# SQLITE_MAX_VARIABLE_NUMBER: 32766 from SQLite 3.32, 999 before that.
+_MAX_VARS = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+@lru_cache(maxsize=64)
+def _insert_sql(table: str, columns: tuple[str, ...], n_rows: int,
+                conflict: str, upsert_on: tuple[str, ...]) -> str:
+    """
+    Multi-row INSERT for `n_rows` rows. Cached, so repeat calls hand sqlite3 the
+    same string object and its statement cache lookup stays trivial.
+    """
+    group = "(" + ",".join("?" * len(columns)) + ")"
+    tail = ""
+    if upsert_on:
+        conflict = ""
+        tail = (f" ON CONFLICT({', '.join(upsert_on)}) DO UPDATE SET "
+                + ", ".join(f"{c}=excluded.{c}" for c in columns if c not in upsert_on))
+    return f"INSERT {conflict} INTO {table} ({', '.join(columns)}) VALUES " + ",".join([group] * n_rows) + tail
+
+
+def bulk_insert(conn, table: str, columns: tuple[str, ...], rows: list[dict],
+                chunk: int = 200, conflict: str = "OR IGNORE", upsert_on: tuple[str, ...] = ()):
+    """
+    Insert dict rows using multi-row ``INSERT ... VALUES (...),(...)`` statements
+    of up to `chunk` rows each, bound positionally.
+
+    With `upsert_on` (the columns of a unique key), existing rows are updated in
+    place via ``ON CONFLICT(...) DO UPDATE`` and `conflict` is ignored.
+    """
+    if not rows:
+        return
+    chunk = max(1, min(chunk, _MAX_VARS // len(columns)))
+    pick = itemgetter(*columns) if len(columns) > 1 else (lambda r: (r[columns[0]],))
+    for i in range(0, len(rows), chunk):
+        batch = rows[i:i + chunk]
+        sql = _insert_sql(table, columns, len(batch), conflict, tuple(upsert_on))
+        conn.execute(sql, list(chain.from_iterable(map(pick, batch))))
 
 
 def upsert_performances(conn, performances: list[dict]):
     """Insert weekly performance snapshots. Skips if already present for this week."""
-    for p in performances:
-        conn.execute("""
-            INSERT OR IGNORE INTO fund_performance
-                (fund_id, week_date, return_1m, return_3m, return_6m)
-            VALUES
-                (:fund_id, :week_date, :return_1m, :return_3m, :return_6m)
-        """, p)
+    bulk_insert(conn, "fund_performance", PERFORMANCE_COLS, performances)
 
 
 def upsert_rankings(conn, rankings: list[dict]):
     """Insert weekly ranking rows."""
-    for r in rankings:
-        conn.execute("""
-            INSERT OR REPLACE INTO fund_rankings
-                (fund_id, sector_code, week_date,
-                 decile_1m, decile_3m, decile_6m,
-                 quartile_1m, quartile_3m, quartile_6m,
-                 rank_1m, rank_3m, rank_6m,
-                 total_in_sector,
-                 streak_1m, streak_3m, streak_6m)
-            VALUES
-                (:fund_id, :sector_code, :week_date,
-                 :decile_1m, :decile_3m, :decile_6m,
-                 :quartile_1m, :quartile_3m, :quartile_6m,
-                 :rank_1m, :rank_3m, :rank_6m,
-                 :total_in_sector,
-                 :streak_1m, :streak_3m, :streak_6m)
-        """, r)
+    # Update in place rather than REPLACE's delete + reinsert (index churn, new rowid)
+    bulk_insert(conn, "fund_rankings", RANKING_COLS, rankings,
+                upsert_on=("fund_id", "sector_code", "week_date"))
 
 
 def insert_alerts(conn, alerts: list[dict]):
     """Insert alert records (only new ones — idempotent)."""
-    for a in alerts:
-        conn.execute("""
-            INSERT OR IGNORE INTO alert_history
-                (fund_id, sector_code, week_date, alert_type, period,
-                 prev_decile, curr_decile, streak_broken, return_value)
-            VALUES
-                (:fund_id, :sector_code, :week_date, :alert_type, :period,
-                 :prev_decile, :curr_decile, :streak_broken, :return_value)
-        """, a)
+    bulk_insert(conn, "alert_history", ALERT_COLS, alerts)
 
 
 def log_pipeline_run(conn, sector_code: str, status: str, funds_scraped: int,
@@ -79,24 +117,29 @@ def log_pipeline_run(conn, sector_code: str, status: str, funds_scraped: int,
     """, (run_date.isoformat(), sector_code, status, funds_scraped, error_message, duration_secs))
 
 
+def get_prior_rankings_by_sector(conn, sector_codes: list[str], week_date: date) -> dict[str, list[dict]]:
+    """
+    Fetch the most recent prior week's rankings for several sectors in one query.
+    Returns {sector_code: [ranking dict, ...]}; sectors with no history are absent.
+    """
+    placeholders = ",".join("?" * len(sector_codes))
+    cursor = conn.execute(f"""
+        SELECT r.*
+        FROM fund_rankings r
+        JOIN (
+            SELECT sector_code, MAX(week_date) AS wd
+            FROM fund_rankings
+            WHERE week_date < ? AND sector_code IN ({placeholders})
+            GROUP BY sector_code
+        ) latest ON latest.sector_code = r.sector_code AND latest.wd = r.week_date
+        ORDER BY r.sector_code, r.fund_id
+    """, (week_date.isoformat(), *sector_codes))
+    by_sector = defaultdict(list)
+    for r in cursor:
+        by_sector[r["sector_code"]].append(dict(r))
+    return dict(by_sector)
+
+
 def get_prior_rankings(conn, sector_code: str, week_date: date) -> list[dict]:
     """Fetch the most recent rankings for a sector prior to the given week."""
-    import sqlite3
-    cursor = conn.execute("""
-        SELECT r.*, f.fund_name
-        FROM fund_rankings r
-        JOIN funds f ON f.fund_id = r.fund_id
-        WHERE r.sector_code = ?
-          AND r.week_date < ?
-        ORDER BY r.week_date DESC, r.fund_id
-    """, (sector_code, week_date.isoformat()))
-    rows = cursor.fetchall()
-    if not rows:
-        return []
-    # Only take the most recent week's data
-    if rows:
-        most_recent_date = rows[0]["week_date"] if hasattr(rows[0], "__getitem__") else rows[0][3]
-        if isinstance(rows[0], sqlite3.Row):
-            most_recent_date = dict(rows[0])["week_date"]
-            return [dict(r) for r in rows if dict(r)["week_date"] == most_recent_date]
-    return [dict(r) for r in rows]
+    return get_prior_rankings_by_sector(conn, [sector_code], week_date).get(sector_code, [])
@@ -6,26 +6,35 @@ Run manually:
     python -m backend.pipeline --date 2026-02-16
 """
 import logging, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
 from datetime import date
 from pathlib import Path
-import yaml
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from backend.db import get_db, init_db, rows_to_dicts
+from backend.db import init_db, load_sectors
 from backend.scraper.trustnet import TrustnetScraper, generate_mock_data
 from backend.engine.ranking import rank_sector
+from backend.engine.persist import (upsert_funds, upsert_performances, upsert_rankings,
+                                    insert_alerts, get_prior_rankings_by_sector)
 
 logging.basicConfig(level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(name)s — %(message)s",
     handlers=[logging.StreamHandler(sys.stdout), logging.FileHandler("pipeline.log")])
 logger = logging.getLogger("fundscope.pipeline")
 
-CONFIG_PATH = Path(__file__).parent.parent / "config" / "sectors.yaml"
 
-def load_config():
-    with open(CONFIG_PATH) as f:
-        return yaml.safe_load(f)
+# Ranking a sector takes milliseconds, so a process pool only pays for its
+# pickling and start-up on a multi-core box with plenty of sectors and funds.
+PARALLEL_RANK_MIN_SECTORS = 4
+PARALLEL_RANK_MIN_FUNDS = 10_000
+
+
+def _timed_fetch(scraper, sector_code: str, week_date: date) -> tuple[list[dict], float]:
+    """Fetch one sector (the scraper's HTTP adapter owns retries), timing the call."""
+    t = time.time()
+    return scraper.fetch_sector(sector_code, week_date), time.time() - t
 
 
 def run_pipeline(week_date: date = None, use_mock_data: bool = False, dry_run: bool = False) -> dict:
@@ -36,13 +45,9 @@ def run_pipeline(week_date: date = None, use_mock_data: bool = False, dry_run: b
     logger.info(f"FundScope Pipeline — IA Unit Trusts & OEICs — {week_date}")
     logger.info(f"Mode: {'MOCK' if use_mock_data else 'LIVE'} | dry_run={dry_run}")
 
-    cfg = load_config()
-    monitored = [s for s in cfg["sectors"] if s.get("monitored")]
+    cfg, sector_map, monitored = load_sectors()
     logger.info(f"Monitoring {len(monitored)} IA sectors")
 
-    # Init DB
-    init_db()
-
     # ── Step 1: Scrape / generate data ───────────────────────────────────────
     all_performances, failed_sectors = {}, []
 
@@ -53,92 +58,72 @@ def run_pipeline(week_date: date = None, use_mock_data: bool = False, dry_run: b
             logger.info(f"  ✓ Mock: {s['name']} ({len(data)} funds)")
     else:
         scraper = TrustnetScraper()
-        for s in monitored:
-            t = time.time()
-            try:
-                data = scraper.fetch_sector(s["code"], week_date)
-                all_performances[s["code"]] = data
-                logger.info(f"  ✓ Scraped: {s['name']} ({len(data)} funds in {time.time()-t:.1f}s)")
-            except Exception as e:
-                failed_sectors.append(s["name"])
-                logger.error(f"  ✗ Failed: {s['name']} — {e}")
+        # Scraping is I/O-bound: fetch sectors concurrently, capped for politeness
+        workers = cfg.get("scraper", {}).get("max_concurrency", 5)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(monitored)))) as ex:
+            futures = [(s, ex.submit(_timed_fetch, scraper, s["code"], week_date)) for s in monitored]
+            for s, fut in futures:
+                try:
+                    data, secs = fut.result()
+                    all_performances[s["code"]] = data
+                    logger.info(f"  ✓ Scraped: {s['name']} ({len(data)} funds in {secs:.1f}s)")
+                except Exception as e:
+                    failed_sectors.append(s["name"])
+                    logger.error(f"  ✗ Failed: {s['name']} — {e}")
 
     total_funds = sum(len(v) for v in all_performances.values())
     logger.info(f"Total fund records: {total_funds}")
 
-    # ── Step 2: Persist performance data ─────────────────────────────────────
-    with get_db() as conn:
-        for sector_code, perfs in all_performances.items():
-            for p in perfs:
-                # Upsert fund
-                conn.execute("""
-                    INSERT INTO funds (fund_id, fund_name, isin, sedol, sector_code, fund_group, active, first_seen, last_seen)
-                    VALUES (:fund_id,:fund_name,:isin,:sedol,:sector_code,:fund_group,1,:wd,:wd)
-                    ON CONFLICT(fund_id) DO UPDATE SET
-                        fund_name=excluded.fund_name, last_seen=excluded.last_seen, active=1,
-                        fund_group=COALESCE(excluded.fund_group, fund_group)
-                """, {**p, "wd": week_date.isoformat()})
-                # Upsert performance
-                conn.execute("""
-                    INSERT OR IGNORE INTO fund_performance
-                        (fund_id, week_date, return_1m, return_3m, return_6m, return_1y)
-                    VALUES (:fund_id,:week_date,:return_1m,:return_3m,:return_6m,:return_1y)
-                """, p)
-    logger.info("Performance data persisted")
-
-    # ── Step 3: Get prior rankings for streak/alert comparison ────────────────
-    prior_by_sector = {}
-    with get_db() as conn:
-        for sector_code in all_performances:
-            rows = conn.execute("""
-                SELECT r.* FROM fund_rankings r
-                WHERE r.sector_code=? AND r.week_date=(
-                    SELECT MAX(week_date) FROM fund_rankings
-                    WHERE sector_code=? AND week_date < ?
-                )
-            """, (sector_code, sector_code, week_date.isoformat())).fetchall()
-            prior_by_sector[sector_code] = rows_to_dicts(rows)
-
-    # ── Step 4: Rank and detect alerts ────────────────────────────────────────
-    sector_map = {s["code"]: s["name"] for s in cfg["sectors"]}
     all_rankings, all_alerts, all_top3 = [], [], {}
 
-    for sector_code, perfs in all_performances.items():
-        result = rank_sector(
-            sector_code, sector_map.get(sector_code, sector_code),
-            perfs, week_date, prior_by_sector.get(sector_code, [])
-        )
-        all_rankings.extend(result["rankings"])
-        all_alerts.extend(result["alerts"])
-        all_top3[sector_code] = result["top3"]
-
-    logger.info(f"Rankings: {len(all_rankings)} | Alerts: {len(all_alerts)}")
-
-    # ── Step 5: Persist rankings and alerts ───────────────────────────────────
-    with get_db() as conn:
-        for r in all_rankings:
-            conn.execute("""
-                INSERT OR REPLACE INTO fund_rankings
-                    (fund_id,sector_code,week_date,
-                     decile_1m,decile_3m,decile_6m,quartile_1m,quartile_3m,quartile_6m,
-                     rank_1m,rank_3m,rank_6m,total_in_sector,streak_1m,streak_3m,streak_6m)
-                VALUES
-                    (:fund_id,:sector_code,:week_date,
-                     :decile_1m,:decile_3m,:decile_6m,:quartile_1m,:quartile_3m,:quartile_6m,
-                     :rank_1m,:rank_3m,:rank_6m,:total_in_sector,:streak_1m,:streak_3m,:streak_6m)
-            """, r)
-        for a in all_alerts:
-            conn.execute("""
-                INSERT OR IGNORE INTO alert_history
-                    (fund_id,sector_code,week_date,alert_type,period,prev_decile,curr_decile,streak_broken,return_value)
-                VALUES (:fund_id,:sector_code,:week_date,:alert_type,:period,:prev_decile,:curr_decile,:streak_broken,:return_value)
-            """, a)
-
-    # ── Step 6: Build fund name lookup ────────────────────────────────────────
-    fund_names = {}
-    with get_db() as conn:
-        for row in conn.execute("SELECT fund_id, fund_name FROM funds").fetchall():
-            fund_names[row["fund_id"]] = row["fund_name"]
+    # One connection for Steps 2–6: schema/seed once, a single commit at the end
+    with closing(init_db()) as conn, conn:
+        # Explicit write transaction: take the RESERVED lock up front rather than
+        # upgrading mid-run, so a concurrent API write fails fast instead of here
+        conn.execute("BEGIN IMMEDIATE")
+
+        # ── Step 2: Persist performance data ─────────────────────────────────
+        flat = [p for perfs in all_performances.values() for p in perfs]
+        upsert_funds(conn, flat, week_date)
+        upsert_performances(conn, flat)
+        logger.info("Performance data persisted")
+
+        # ── Step 3: Get prior rankings for streak/alert comparison ────────────
+        prior_by_sector = get_prior_rankings_by_sector(conn, list(all_performances), week_date)
+
+        # ── Step 4: Rank and detect alerts ────────────────────────────────────
+        jobs = [(sc, sector_map.get(sc, sc), perfs, week_date, prior_by_sector.get(sc, []))
+                for sc, perfs in all_performances.items()]
+        workers = os.cpu_count() or 1
+        if (workers > 1 and len(jobs) >= PARALLEL_RANK_MIN_SECTORS
+                and total_funds >= PARALLEL_RANK_MIN_FUNDS):
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+                results = list(ex.map(rank_sector, *zip(*jobs)))
+        else:
+            results = [rank_sector(*job) for job in jobs]
+
+        # Collected in sector order so alerts/digest ordering doesn't depend on timing
+        for (sector_code, *_), result in zip(jobs, results):
+            all_rankings.extend(result["rankings"])
+            all_alerts.extend(result["alerts"])
+            all_top3[sector_code] = result["top3"]
+
+        logger.info(f"Rankings: {len(all_rankings)} | Alerts: {len(all_alerts)}")
+
+        # ── Step 5: Persist rankings and alerts ───────────────────────────────
+        upsert_rankings(conn, all_rankings)
+        insert_alerts(conn, all_alerts)
+        # Refresh planner statistics after the bulk load so the indexes get used;
+        # optimize only re-analyzes tables whose stats have gone stale
+        conn.execute("PRAGMA optimize")
+        # Writes are done: release the write lock before the read-only lookup
+        conn.commit()
+
+        # ── Step 6: Build fund name lookup ────────────────────────────────────
+        cur = conn.cursor()
+        cur.row_factory = None      # plain tuples: no sqlite3.Row per fund
+        cur.arraysize = 1000
+        fund_names = dict(cur.execute("SELECT fund_id, fund_name FROM funds"))
 
     # ── Step 7: Email ─────────────────────────────────────────────────────────
     email_ok = True
@@ -155,11 +140,10 @@ def run_pipeline(week_date: date = None, use_mock_data: bool = False, dry_run: b
             email_ok = False
     else:
         try:
-            from backend.email.dispatcher import render_digest
-            html = render_digest(week_date, all_alerts, all_top3, fund_names,
-                                 sector_map, failed_sectors, total_funds)
+            from backend.email.dispatcher import write_digest
             out = Path(f"digest_preview_{week_date}.html")
-            out.write_text(html)
+            write_digest(out, week_date, all_alerts, all_top3, fund_names,
+                         sector_map, failed_sectors, total_funds)
             logger.info(f"Email preview → {out}")
         except Exception as e:
             logger.error(f"Preview render failed: {e}")
@@ -1,119 +1,281 @@
 """backend/engine/ranking.py — Decile/quartile ranking and alert detection."""
 import logging
+import math
+import pickle
+from collections import OrderedDict
 from datetime import date
+from hashlib import blake2b
+from itertools import repeat
 import pandas as pd
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+PERIODS = ("1m", "3m", "6m")
+SMALL_SECTOR = 50   # below this, pure Python beats DataFrame setup
+
+# Results of recent rank_sector calls keyed on a digest of their inputs, so
+# backfills that replay unchanged weeks don't re-rank them
+_RANK_CACHE: "OrderedDict[bytes, dict]" = OrderedDict()
+_RANK_CACHE_SIZE = 128
+
+def _ranks(vals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    1-based descending ranks with ties broken by position (pandas' method="first"),
+    computed with a stable argsort. Returns (ranks, valid_mask); NaN slots hold -1.
+    """
+    m = ~np.isnan(vals)
+    v = vals[m]
+    order = np.argsort(-v, kind="stable")
+    r = np.empty(v.size, np.int64)
+    r[order] = np.arange(1, v.size + 1)
+    out = np.full(vals.size, -1, np.int64)
+    out[m] = r
+    return out, m
+
+def _band_values(ranks: np.ndarray, mask: np.ndarray, buckets: int,
+                 min_valid: int) -> tuple[np.ndarray, np.ndarray]:
+    """Map ranks to 1..buckets (raw rank when buckets=0). Returns (values, valid_mask)."""
+    n = int(mask.sum())
+    if n < min_valid:
+        return np.zeros(ranks.size, np.int64), np.zeros(ranks.size, bool)
+    vals = ranks if not buckets else np.ceil(ranks / n * buckets).clip(1, buckets).astype(np.int64)
+    return vals, mask
+
+def _bands(ranks: np.ndarray, mask: np.ndarray, buckets: int, min_valid: int) -> pd.arrays.IntegerArray:
+    """_band_values as a nullable Int64 array."""
+    vals, valid = _band_values(ranks, mask, buckets, min_valid)
+    return pd.arrays.IntegerArray(vals, ~valid)
+
+def _nullable(vals: np.ndarray, valid: np.ndarray) -> list:
+    """Python ints with None where invalid, ready for dicts/sqlite."""
+    out = vals.astype(object)
+    out[~valid] = None
+    return out.tolist()
+
+def _as_float(series: pd.Series) -> np.ndarray:
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
 def assign_deciles(series: pd.Series) -> pd.Series:
-    valid = series.dropna()
-    if len(valid) < 2:
-        return pd.Series(pd.NA, index=series.index, dtype="Int64")
-    ranks = valid.rank(ascending=False, method="first")
-    n = len(valid)
-    deciles = np.ceil(ranks / n * 10).clip(1, 10).astype("Int64")
-    result = pd.Series(pd.NA, index=series.index, dtype="Int64")
-    result[valid.index] = deciles
-    return result
+    ranks, mask = _ranks(_as_float(series))
+    return pd.Series(_bands(ranks, mask, 10, 2), index=series.index)
 
 def assign_quartiles(series: pd.Series) -> pd.Series:
-    valid = series.dropna()
-    if len(valid) < 2:
-        return pd.Series(pd.NA, index=series.index, dtype="Int64")
-    ranks = valid.rank(ascending=False, method="first")
-    n = len(valid)
-    quartiles = np.ceil(ranks / n * 4).clip(1, 4).astype("Int64")
-    result = pd.Series(pd.NA, index=series.index, dtype="Int64")
-    result[valid.index] = quartiles
-    return result
+    ranks, mask = _ranks(_as_float(series))
+    return pd.Series(_bands(ranks, mask, 4, 2), index=series.index)
 
 def assign_ranks(series: pd.Series) -> pd.Series:
-    valid = series.dropna()
-    if len(valid) < 1:
-        return pd.Series(pd.NA, index=series.index, dtype="Int64")
-    ranks = valid.rank(ascending=False, method="first").astype("Int64")
-    result = pd.Series(pd.NA, index=series.index, dtype="Int64")
-    result[valid.index] = ranks
-    return result
+    ranks, mask = _ranks(_as_float(series))
+    return pd.Series(_bands(ranks, mask, 0, 1), index=series.index)
+
+def _cache_key(*args) -> bytes | None:
+    # pickle rather than JSON: NaN, ±inf and None must stay distinct keys,
+    # since the ranking treats missing and NaN returns differently
+    try:
+        return blake2b(pickle.dumps(args, protocol=pickle.HIGHEST_PROTOCOL), digest_size=16).digest()
+    except (pickle.PicklingError, TypeError, AttributeError):   # unpicklable — just don't cache
+        return None
+
+def _copy_result(result: dict) -> dict:
+    # Records hold only scalars, so copying each dict is a full copy
+    return {k: [dict(r) for r in v] if isinstance(v, list) else v for k, v in result.items()}
 
 def rank_sector(sector_code: str, sector_name: str, performances: list[dict],
                 week_date: date, prior: list[dict],
                 quartile_threshold: int = 20, min_funds: int = 5) -> dict:
+    """
+    Rank a sector's funds and detect top-band drops against the prior week.
+    Large sectors are memoised on the inputs (order included, since it breaks
+    ties); callers get their own copy of a cached result.
+    """
+    # Small sectors rank faster than they hash, so only large ones are memoised
+    key = None
+    if len(performances) >= SMALL_SECTOR:
+        key = _cache_key(sector_code, sector_name, performances, week_date, prior,
+                         quartile_threshold, min_funds)
+    if key is not None and key in _RANK_CACHE:
+        _RANK_CACHE.move_to_end(key)
+        return _copy_result(_RANK_CACHE[key])
+    result = _rank_sector(sector_code, sector_name, performances, week_date, prior,
+                          quartile_threshold, min_funds)
+    if key is not None:
+        _RANK_CACHE[key] = _copy_result(result)
+        if len(_RANK_CACHE) > _RANK_CACHE_SIZE:
+            _RANK_CACHE.popitem(last=False)
+    return result
+
+def _rank_sector(sector_code: str, sector_name: str, performances: list[dict],
+                 week_date: date, prior: list[dict],
+                 quartile_threshold: int, min_funds: int) -> dict:
     if not performances:
         return {"rankings": [], "alerts": [], "top3": [], "use_quartiles": False, "n": 0}
-    df = pd.DataFrame(performances)
-    n = len(df)
+    n = len(performances)
     if n < min_funds:
         logger.warning(f"Sector {sector_name}: only {n} funds — skipping")
         return {"rankings": [], "alerts": [], "top3": [], "use_quartiles": False, "n": n}
 
     use_q = n < quartile_threshold
-    for p in ["1m", "3m", "6m"]:
+    week_iso = week_date.isoformat()
+    if n < SMALL_SECTOR:
+        return _rank_small(sector_code, sector_name, performances, week_iso, prior, use_q)
+
+    df = pd.DataFrame(performances)
+    fund_ids = df["fund_id"].tolist()
+
+    # Prior week's streak and top-band flags, flattened once into int arrays aligned
+    # to this week's funds (missing fund → default). Only the columns used are loaded.
+    band = "quartile" if use_q else "decile"
+    alert_type = f"{band}_drop"
+    prior_cols = {**{f"streak_{p}": 0 for p in PERIODS}, **{f"{band}_{p}": 99 for p in PERIODS}}
+    current = set(fund_ids)    # funds that left the sector don't need loading
+    prior_df = pd.DataFrame([r for r in prior or [] if r["fund_id"] in current],
+                            columns=["fund_id", *prior_cols])
+    prior_df = prior_df.drop_duplicates("fund_id", keep="last").set_index("fund_id").reindex(fund_ids)
+    prev = {}
+    for col, default in prior_cols.items():
+        vals = pd.to_numeric(prior_df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan, copy=True)
+        vals[np.isnan(vals) | (vals == 0)] = default      # mirrors int(x or default)
+        prev[col] = vals.astype(np.int64)
+
+    bands, streaks, found = {}, {}, []   # found: (fund position, period index, alert)
+    for i, p in enumerate(PERIODS):
         col = f"return_{p}"
         if col in df.columns:
-            df[f"decile_{p}"]   = assign_deciles(df[col])
-            df[f"quartile_{p}"] = assign_quartiles(df[col])
-            df[f"rank_{p}"]     = assign_ranks(df[col])
+            ranks, mask = _ranks(_as_float(df[col]))
+            raw_returns = df[col].to_numpy()
         else:
-            df[f"decile_{p}"] = pd.NA
-            df[f"quartile_{p}"] = pd.NA
-            df[f"rank_{p}"] = pd.NA
-    df["total_in_sector"] = n
-
-    prior_map = {r["fund_id"]: r for r in (prior or [])}
-    alerts, rankings = [], []
-
-    for _, row in df.iterrows():
-        fid = row["fund_id"]
-        prev = prior_map.get(fid, {})
-        streaks = {}
-
-        for p in ["1m", "3m", "6m"]:
-            cd = int(row[f"decile_{p}"]) if pd.notna(row[f"decile_{p}"]) else None
-            cq = int(row[f"quartile_{p}"]) if pd.notna(row[f"quartile_{p}"]) else None
-            prev_streak = int(prev.get(f"streak_{p}", 0) or 0)
-            in_top = (cq == 1) if use_q else (cd == 1)
-            streaks[f"streak_{p}"] = prev_streak + 1 if in_top else 0
-
-            # Alert: was in top last week, not now
-            if use_q:
-                was_top = int(prev.get(f"quartile_{p}", 99) or 99) == 1
-                if was_top and cq != 1:
-                    alerts.append(dict(fund_id=fid, sector_code=sector_code,
-                        week_date=week_date.isoformat(), alert_type="quartile_drop",
-                        period=p, prev_decile=1, curr_decile=cq,
-                        streak_broken=prev_streak,
-                        return_value=float(row.get(f"return_{p}") or 0)))
-            else:
-                was_top = int(prev.get(f"decile_{p}", 99) or 99) == 1
-                if was_top and cd != 1:
-                    alerts.append(dict(fund_id=fid, sector_code=sector_code,
-                        week_date=week_date.isoformat(), alert_type="decile_drop",
-                        period=p, prev_decile=1, curr_decile=cd,
-                        streak_broken=prev_streak,
-                        return_value=float(row.get(f"return_{p}") or 0)))
-
-        def safe_int(v):
-            return int(v) if pd.notna(v) else None
-        rankings.append({
-            "fund_id": fid, "sector_code": sector_code, "week_date": week_date.isoformat(),
-            "decile_1m": safe_int(row["decile_1m"]), "decile_3m": safe_int(row["decile_3m"]),
-            "decile_6m": safe_int(row["decile_6m"]),
-            "quartile_1m": safe_int(row["quartile_1m"]), "quartile_3m": safe_int(row["quartile_3m"]),
-            "quartile_6m": safe_int(row["quartile_6m"]),
-            "rank_1m": safe_int(row["rank_1m"]), "rank_3m": safe_int(row["rank_3m"]),
-            "rank_6m": safe_int(row["rank_6m"]),
-            "total_in_sector": n, **streaks,
-        })
-
-    df_6m = df.dropna(subset=["return_6m"]).nlargest(3, "return_6m")
+            ranks, mask = np.full(n, -1, np.int64), np.zeros(n, bool)
+            raw_returns = None
+        dec = bands[f"decile_{p}"]   = _band_values(ranks, mask, 10, 2)
+        qua = bands[f"quartile_{p}"] = _band_values(ranks, mask, 4, 2)
+        bands[f"rank_{p}"] = _band_values(ranks, mask, 0, 1)
+
+        top_vals, top_ok = qua if use_q else dec
+        in_top = top_ok & (top_vals == 1)
+        prev_streak = prev[f"streak_{p}"]
+        streaks[f"streak_{p}"] = np.where(in_top, prev_streak + 1, 0).tolist()
+
+        # Alert: was in top last week, not now
+        was_top = prev[f"{band}_{p}"] == 1
+        for j in np.flatnonzero(was_top & ~in_top).tolist():
+            found.append((j, i, {
+                "fund_id": fund_ids[j], "sector_code": sector_code, "week_date": week_iso,
+                "alert_type": alert_type, "period": p, "prev_decile": 1,
+                "curr_decile": int(top_vals[j]) if top_ok[j] else None,
+                "streak_broken": int(prev_streak[j]),
+                "return_value": float((raw_returns[j] if raw_returns is not None else None) or 0)}))
+
+    # Fund-major order, periods 1m → 6m within a fund
+    found.sort(key=lambda t: (t[0], t[1]))
+    alerts = [a for _, _, a in found]
+
+    columns = {"fund_id": fund_ids, "sector_code": repeat(sector_code), "week_date": repeat(week_iso)}
+    for kind in ("decile", "quartile", "rank"):
+        for p in PERIODS:
+            columns[f"{kind}_{p}"] = _nullable(*bands[f"{kind}_{p}"])
+    columns["total_in_sector"] = repeat(n)
+    columns.update(streaks)
+    keys = tuple(columns)
+    rankings = [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+    # Top 3 by 6M straight from the stable ranks above — O(n), same tie-breaking as nlargest
+    rank6, ok6 = bands["rank_6m"]
+    top_pos = np.flatnonzero(ok6 & (rank6 <= 3))
+    top_pos = top_pos[np.argsort(rank6[top_pos])].tolist()
+
+    def ret(col: str, j: int):
+        if col not in df.columns:
+            return None
+        v = df[col].iat[j]
+        return float(v) if pd.notna(v) else None
+
+    top3 = [{
+        "rank": i+1, "fund_id": fund_ids[j], "fund_name": df["fund_name"].iat[j],
+        "sector_code": sector_code, "sector_name": sector_name,
+        "return_6m": ret("return_6m", j),
+        "return_3m": ret("return_3m", j),
+        "return_1m": ret("return_1m", j),
+    } for i, j in enumerate(top_pos)]
+
+    return {"rankings": rankings, "alerts": alerts, "top3": top3, "use_quartiles": use_q, "n": n}
+
+
+def _prior_int(row: dict, col: str, default: int) -> int:
+    x = row.get(col) if row else None
+    return default if x is None or x != x or x == 0 else int(x)
+
+def _rank_small(sector_code: str, sector_name: str, performances: list[dict],
+                week_iso: str, prior: list[dict], use_q: bool) -> dict:
+    """
+    rank_sector for small sectors in plain Python — same output as the NumPy path,
+    without paying DataFrame construction for a few dozen funds.
+    """
+    n = len(performances)
+    band = "quartile" if use_q else "decile"
+    alert_type = f"{band}_drop"
+    fund_ids = [p["fund_id"] for p in performances]
+    current = set(fund_ids)
+    latest = {r["fund_id"]: r for r in prior or [] if r["fund_id"] in current}
+    prior_rows = [latest.get(fid) for fid in fund_ids]
+
+    def bucket(r, m: int, buckets: int):
+        if r is None or m < 2:
+            return None
+        return min(buckets, max(1, math.ceil(r / m * buckets)))
+
+    bands, streaks, found, returns = {}, {}, [], {}
+    for i, p in enumerate(PERIODS):
+        col = f"return_{p}"
+        vals = returns[col] = [perf.get(col) for perf in performances]
+        valid = [j for j, v in enumerate(vals) if v is not None and v == v]
+        valid.sort(key=lambda j: -vals[j])     # stable: ties keep input order
+        m = len(valid)
+        rank = [None] * n
+        for r, j in enumerate(valid, 1):
+            rank[j] = r
+        dec = bands[f"decile_{p}"]   = [bucket(r, m, 10) for r in rank]
+        qua = bands[f"quartile_{p}"] = [bucket(r, m, 4) for r in rank]
+        bands[f"rank_{p}"] = rank
+        top = qua if use_q else dec
+
+        prev_streak = [_prior_int(row, f"streak_{p}", 0) for row in prior_rows]
+        streaks[f"streak_{p}"] = [s + 1 if t == 1 else 0 for s, t in zip(prev_streak, top)]
+
+        # Alert: was in top last week, not now. A numeric column reads gaps as NaN.
+        gap = math.nan if any(v is not None for v in vals) else 0
+        for j, row in enumerate(prior_rows):
+            if _prior_int(row, f"{band}_{p}", 99) == 1 and top[j] != 1:
+                found.append((j, i, {
+                    "fund_id": fund_ids[j], "sector_code": sector_code, "week_date": week_iso,
+                    "alert_type": alert_type, "period": p, "prev_decile": 1,
+                    "curr_decile": top[j], "streak_broken": prev_streak[j],
+                    "return_value": float((gap if vals[j] is None else vals[j]) or 0)}))
+
+    found.sort(key=lambda t: (t[0], t[1]))
+    alerts = [a for _, _, a in found]
+
+    columns = {"fund_id": fund_ids, "sector_code": repeat(sector_code), "week_date": repeat(week_iso)}
+    for kind in ("decile", "quartile", "rank"):
+        for p in PERIODS:
+            columns[f"{kind}_{p}"] = bands[f"{kind}_{p}"]
+    columns["total_in_sector"] = repeat(n)
+    columns.update(streaks)
+    keys = tuple(columns)
+    rankings = [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+    rank6 = bands["rank_6m"]
+    top_pos = sorted((j for j in range(n) if rank6[j] is not None and rank6[j] <= 3), key=rank6.__getitem__)
+
+    def ret(col: str, j: int):
+        v = returns[col][j]
+        return float(v) if v is not None and v == v else None
+
     top3 = [{
-        "rank": i+1, "fund_id": r["fund_id"], "fund_name": r["fund_name"],
+        "rank": i+1, "fund_id": fund_ids[j], "fund_name": performances[j].get("fund_name"),
         "sector_code": sector_code, "sector_name": sector_name,
-        "return_6m": float(r["return_6m"]),
-        "return_3m": float(r["return_3m"]) if pd.notna(r.get("return_3m")) else None,
-        "return_1m": float(r["return_1m"]) if pd.notna(r.get("return_1m")) else None,
-    } for i, (_, r) in enumerate(df_6m.iterrows())]
+        "return_6m": ret("return_6m", j),
+        "return_3m": ret("return_3m", j),
+        "return_1m": ret("return_1m", j),
+    } for i, j in enumerate(top_pos)]
 
     return {"rankings": rankings, "alerts": alerts, "top3": top3, "use_quartiles": use_q, "n": n}
@@ -0,0 +1,45 @@
+"""backend/scraper/serialization.py — JSON decoding shared by the scrapers."""
+import threading
+
+try:
+    import orjson
+except ImportError:     # stdlib fallback, ~3x slower on large payloads
+    orjson = None
+    import json
+
+try:
+    import simdjson     # optional: lazy, tape-backed parsing
+except ImportError:
+    simdjson = None
+
+# Types parse_lazy() may hand back for JSON arrays / objects
+ARRAY_TYPES = (list,) if simdjson is None else (list, simdjson.Array)
+OBJECT_TYPES = (dict,) if simdjson is None else (dict, simdjson.Object)
+
+# A simdjson Parser is reused across documents, but not across threads
+_local = threading.local()
+
+
+def loads(data: bytes | str):
+    """Decode a JSON document (raw response bytes preferred — no str round-trip)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def parse_lazy(data: bytes):
+    """
+    Parse JSON for reading a few keys out of a large document. With pysimdjson,
+    arrays/objects are views over the parser's tape and values are only built
+    when read; drop the result before the thread's next call. Otherwise, loads().
+    """
+    if simdjson is None:
+        return loads(data)
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = simdjson.Parser()
+    try:
+        return parser.parse(data)
+    except RuntimeError:    # an earlier document is still referenced
+        parser = _local.parser = simdjson.Parser()
+        return parser.parse(data)
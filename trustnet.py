@@ -28,26 +28,51 @@ NOTE: Verify the exact API endpoint and field names using browser DevTools
       The mock data generator below provides a faithful substitute for development.
 """
 
-import re, time, logging, random
+import re, sys, time, logging, asyncio
+from functools import lru_cache
+from hashlib import blake2b
+from importlib.util import find_spec
 from datetime import date
-from pathlib import Path
 from urllib.parse import quote_plus
-import yaml
+
+import numpy as np
+
+from backend.db import load_config, load_sectors
+from backend.scraper.serialization import ARRAY_TYPES, OBJECT_TYPES, parse_lazy
 
 logger = logging.getLogger(__name__)
-CONFIG_PATH = Path(__file__).parent.parent.parent / "config" / "sectors.yaml"
 
-def load_config():
-    with open(CONFIG_PATH) as f:
-        return yaml.safe_load(f)
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
 
+# The same (name, isin) pairs come back every week
+@lru_cache(maxsize=4096)
 def make_fund_id(fund_name: str, isin: str = None) -> str:
     if isin and isin.strip() and isin.strip().upper() not in ("N/A", "NONE", ""):
         return isin.strip().upper()
-    slug = re.sub(r"[^a-z0-9]+", "-", fund_name.lower()).strip("-")[:60]
+    slug = _SLUG_RE.sub("-", fund_name.lower()).strip("-")[:60]
     return f"f-{slug}"
 
 
+# One pass strips "%" / thousands separators and normalises the Unicode minus
+_RET_TRANS = str.maketrans({"%": None, ",": None, "−": "-"})
+_RET_BLANK = frozenset({"", "-", "n/a", "N/A", "—"})
+
+
+def _pick(record, keys: tuple):
+    """Value of the first key present in `record` (even if null), else None."""
+    for key in keys:
+        if key in record:
+            return record[key]
+    return None
+
+
+def _s(value) -> str | None:
+    """Stripped text of a JSON scalar; skips the str() copy when it already is one."""
+    if type(value) is str:
+        return value.strip()
+    return str(value).strip() if value is not None else None
+
+
 class TrustnetScraper:
     """
     Fetches IA Unit Trust & OEIC performance data from Trustnet.
@@ -87,90 +112,120 @@ class TrustnetScraper:
         "return_1y":  ["performance1Y",  "return1Y",  "1Y",  "oneYear",   "p1y"],
         "return_3y":  ["performance3Y",  "return3Y",  "3Y",  "threeYear", "p3y"],
     }
+    # Statuses worth retrying: throttling and transient server errors
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    # Frozen once for the per-record loops
+    _FIELD_KEYS = {field: tuple(keys) for field, keys in FIELD_MAP.items()}
+
+    # HTML table header substrings (lower-case), in priority order
+    HTML_COL_PATTERNS = {
+        "fund_name":  ("fund", "name"),
+        "isin":       ("isin",),
+        "return_1m":  ("1 m", "1m", "1 month"),
+        "return_3m":  ("3 m", "3m", "3 month"),
+        "return_6m":  ("6 m", "6m", "6 month"),
+        "return_1y":  ("1 y", "1y", "1 year"),
+    }
 
     def __init__(self):
         import requests
-        cfg = load_config()
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.request import ACCEPT_ENCODING
+        from urllib3.util.retry import Retry
+        cfg = load_config(shared=True)
         sc = cfg.get("scraper", {})
+        self.retries  = sc.get("max_retries", 3)       # attempts per request
+        self.backoff  = sc.get("retry_backoff_secs", 1.5)
         self.session = requests.Session()
+        # Every request goes to trustnet.com: keep enough warm connections for
+        # the concurrent sector fetches. urllib3 retries connection errors and
+        # throttling/5xx with exponential back-off (1.5s, 3s, …), honouring
+        # Retry-After; raise_on_status=False leaves the final error to _get.
+        retry = Retry(total=max(0, self.retries - 1), backoff_factor=self.backoff,
+                      status_forcelist=self.RETRY_STATUSES, allowed_methods=("GET",),
+                      respect_retry_after_header=True, raise_on_status=False)
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry))
         self.session.headers.update({
             "User-Agent": sc.get("user_agent", "FundScope/1.0"),
             "Accept": "application/json, text/html, */*",
             "Accept-Language": "en-GB,en;q=0.9",
+            # Whatever urllib3 can decode here (adds br/zstd when those are installed)
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive",
             "Referer": self.PERF_URL,
         })
         self.delay    = sc.get("request_delay_secs", 4)
-        self.retries  = sc.get("max_retries", 3)
-        self.retry_d  = sc.get("retry_delay_secs", 30)
         self.timeout  = sc.get("timeout_secs", 30)
         self.page_sz  = sc.get("page_size", 500)
+        self.max_conc = sc.get("max_concurrency", 5)
+        self._good_api_url = None   # first endpoint that answered; tried first from then on
 
     def _get(self, url, params=None):
-        import requests
-        for attempt in range(1, self.retries + 1):
-            try:
-                r = self.session.get(url, params=params, timeout=self.timeout)
-                r.raise_for_status()
-                return r
-            except requests.RequestException as e:
-                logger.warning(f"Attempt {attempt}/{self.retries} failed: {e}")
-                if attempt < self.retries:
-                    time.sleep(self.retry_d)
-                else:
-                    raise
+        # Retries happen in the session's adapter (see __init__)
+        r = self.session.get(url, params=params, timeout=self.timeout)
+        r.raise_for_status()
+        return r
 
     def _extract_field(self, record: dict, field: str):
         """Try multiple candidate field names, return first match."""
-        for key in self.FIELD_MAP.get(field, []):
-            if key in record:
-                return record[key]
-        return None
+        return _pick(record, self._FIELD_KEYS.get(field, ()))
 
     def _parse_return(self, val) -> float | None:
         if val is None:
             return None
         try:
-            s = str(val).replace("%", "").replace(",", "").replace("−", "-").strip()
-            return None if s in ("", "-", "n/a", "N/A", "—") else float(s)
+            s = str(val).translate(_RET_TRANS).strip()
+            return None if s in _RET_BLANK else float(s)
         except (ValueError, TypeError):
             return None
 
     def _parse_api_response(self, data, sector_code: str, week_date: date) -> list[dict]:
         """Parse Trustnet JSON API response into normalised fund dicts."""
         # API might return list directly or nested under a key
-        if isinstance(data, list):
+        if isinstance(data, ARRAY_TYPES):
             records = data
-        elif isinstance(data, dict):
+        elif isinstance(data, OBJECT_TYPES):
             records = (data.get("data") or data.get("funds") or
                        data.get("results") or data.get("items") or [])
         else:
             return []
 
+        # Candidate keys and helpers bound once, outside the per-record loop
+        fk = self._FIELD_KEYS
+        k_name, k_isin, k_sedol, k_group = fk["fund_name"], fk["isin"], fk["sedol"], fk["fund_group"]
+        k_1m, k_3m, k_6m, k_1y, k_3y = (fk[f"return_{p}"] for p in ("1m", "3m", "6m", "1y", "3y"))
+        pick, ret = _pick, self._parse_return
+        # Interned: every record (and every sector this week) shares the same objects
+        sector_code, week_iso = sys.intern(sector_code), sys.intern(week_date.isoformat())
+
         results = []
         for rec in records:
-            name = self._extract_field(rec, "fund_name")
-            if not name or str(name).strip() in ("", "nan"):
+            name = pick(rec, k_name)
+            if not name:
+                continue
+            name = _s(name)
+            if name in ("", "nan"):
                 continue
-            isin = self._extract_field(rec, "isin")
+            isin = _s(pick(rec, k_isin) or None)
             results.append({
-                "fund_id":    make_fund_id(str(name), str(isin) if isin else None),
-                "fund_name":  str(name).strip(),
-                "isin":       str(isin).strip() if isin else None,
-                "sedol":      str(self._extract_field(rec, "sedol") or "").strip() or None,
-                "fund_group": str(self._extract_field(rec, "fund_group") or "").strip() or None,
+                "fund_id":    make_fund_id(name, isin),
+                "fund_name":  name,
+                "isin":       isin,
+                "sedol":      _s(pick(rec, k_sedol) or None) or None,
+                "fund_group": _s(pick(rec, k_group) or None) or None,
                 "sector_code": sector_code,
-                "week_date":  week_date.isoformat(),
-                "return_1m":  self._parse_return(self._extract_field(rec, "return_1m")),
-                "return_3m":  self._parse_return(self._extract_field(rec, "return_3m")),
-                "return_6m":  self._parse_return(self._extract_field(rec, "return_6m")),
-                "return_1y":  self._parse_return(self._extract_field(rec, "return_1y")),
-                "return_3y":  self._parse_return(self._extract_field(rec, "return_3y")),
+                "week_date":  week_iso,
+                "return_1m":  ret(pick(rec, k_1m)),
+                "return_3m":  ret(pick(rec, k_3m)),
+                "return_6m":  ret(pick(rec, k_6m)),
+                "return_1y":  ret(pick(rec, k_1y)),
+                "return_3y":  ret(pick(rec, k_3y)),
             })
         return results
 
-    def fetch_sector_api(self, sector_code: str, week_date: date) -> list[dict]:
-        """Try Trustnet's internal JSON API."""
-        params = {
+    def _api_params(self, sector_code: str) -> dict:
+        return {
             "universe":  "o",
             "sector":    sector_code,
             "sortby":    "P11GBP_D_6M",
@@ -178,14 +233,27 @@ class TrustnetScraper:
             "pageSize":  self.page_sz,
             "norisk":    "true",
         }
-        for api_url in self.API_CANDIDATES:
+
+    def _api_urls(self) -> list[str]:
+        good = self._good_api_url
+        if good is None:
+            return self.API_CANDIDATES
+        return [good] + [u for u in self.API_CANDIDATES if u != good]
+
+    def fetch_sector_api(self, sector_code: str, week_date: date) -> list[dict]:
+        """Try Trustnet's internal JSON API."""
+        params = self._api_params(sector_code)
+        for api_url in self._api_urls():
             try:
                 resp = self._get(api_url, params=params)
                 if "application/json" in resp.headers.get("Content-Type", ""):
-                    data = resp.json()
+                    # Lazy parse: only the FIELD_MAP keys of each record get materialised
+                    data = parse_lazy(resp.content)
                     results = self._parse_api_response(data, sector_code, week_date)
+                    del data    # release the parser's tape before the next parse
                     if results:
                         logger.info(f"  ✓ API: {sector_code} → {len(results)} funds")
+                        self._good_api_url = api_url
                         time.sleep(self.delay)
                         return results
             except Exception as e:
@@ -194,8 +262,10 @@ class TrustnetScraper:
 
     def fetch_sector_html(self, sector_code: str, week_date: date) -> list[dict]:
         """Fallback: parse Trustnet HTML performance table."""
+        from io import StringIO
         import pandas as pd
-        from bs4 import BeautifulSoup
+        import lxml.html
+        from lxml import etree
 
         params = {
             "norisk":    "true",
@@ -207,47 +277,60 @@ class TrustnetScraper:
         resp = self._get(self.PERF_URL, params=params)
         time.sleep(self.delay)
 
-        soup = BeautifulSoup(resp.text, "lxml")
-        tables = soup.find_all("table")
+        # One lxml parse of the raw bytes (lxml detects the charset itself); rank
+        # tables by data-row count and only hand the winner (or the next, if it
+        # won't parse) to read_html
+        root = lxml.html.fromstring(resp.content)
+        tables = sorted(root.xpath("//table"), key=lambda t: len(t.xpath(".//tr[td]")), reverse=True)
         best_df, best_n = None, 0
         for tbl in tables:
             try:
-                dfs = pd.read_html(str(tbl))
-                if dfs and len(dfs[0]) > best_n:
+                dfs = pd.read_html(StringIO(etree.tostring(tbl, encoding="unicode")))
+                if dfs and len(dfs[0]) > 0:
                     best_df, best_n = dfs[0], len(dfs[0])
+                    break
             except Exception:
                 continue
 
         if best_df is None or best_n == 0:
             raise ValueError(f"No parseable table found for {sector_code}")
 
-        # Try to map columns
-        col_patterns = {
-            "fund_name":  ["Fund", "Name"],
-            "isin":       ["ISIN"],
-            "return_1m":  ["1 m", "1m", "1 Month"],
-            "return_3m":  ["3 m", "3m", "3 Month"],
-            "return_6m":  ["6 m", "6m", "6 Month"],
-            "return_1y":  ["1 y", "1y", "1 Year"],
-        }
-        def find_col(df, patterns):
+        # Map columns: headers lower-cased once, every field resolved up front
+        headers = [(c, str(c).lower()) for c in best_df.columns]
+        def find_col(patterns):
             for p in patterns:
-                for c in df.columns:
-                    if p.lower() in str(c).lower():
+                for c, low in headers:
+                    if p in low:
                         return c
             return None
+        cols = {field: find_col(patterns) for field, patterns in self.HTML_COL_PATTERNS.items()}
+
+        def parse_returns(key: str) -> list:
+            """_parse_return over a whole column with pandas string ops."""
+            col = cols[key]
+            if col is None:
+                return [None] * len(best_df)
+            # fillna: pandas>=3's str dtype keeps empty cells missing rather than "nan"
+            s = best_df[col].astype(str).fillna("nan").str.translate(_RET_TRANS).str.strip()
+            num = pd.to_numeric(s, errors="coerce").astype(float)
+            # Like float(): a literal "nan" (empty cell) stays NaN, anything unparseable is None
+            bad = s.isin(_RET_BLANK) | (num.isna() & ~s.str.lower().isin(("nan", "+nan", "-nan")))
+            return num.astype(object).where(~bad, None).tolist()
 
         results = []
-        name_col = find_col(best_df, col_patterns["fund_name"])
+        name_col, isin_col = cols["fund_name"], cols["isin"]
         if not name_col:
             raise ValueError(f"Cannot find fund name column in HTML table. Cols: {list(best_df.columns)}")
+        isins = best_df[isin_col].tolist() if isin_col else [None] * len(best_df)
+        returns = zip(*(parse_returns(k) for k in ("return_1m", "return_3m", "return_6m", "return_1y")))
+        # Interned: every record (and every sector this week) shares the same objects
+        sector_code, week_iso = sys.intern(sector_code), sys.intern(week_date.isoformat())
 
-        for _, row in best_df.iterrows():
-            name = str(row.get(name_col, "")).strip()
+        for raw_name, raw_isin, (r1m, r3m, r6m, r1y) in zip(best_df[name_col].tolist(), isins, returns):
+            name = str(raw_name).strip()
             if not name or name.lower() in ("nan", "name", "fund"):
                 continue
-            isin_col = find_col(best_df, col_patterns["isin"])
-            isin = str(row.get(isin_col, "")).strip() if isin_col else None
+            isin = str(raw_isin).strip() if isin_col else None
             results.append({
                 "fund_id":    make_fund_id(name, isin),
                 "fund_name":  name,
@@ -255,11 +338,11 @@ class TrustnetScraper:
                 "sedol":      None,
                 "fund_group": None,
                 "sector_code": sector_code,
-                "week_date":  week_date.isoformat(),
-                "return_1m":  self._parse_return(row.get(find_col(best_df, col_patterns["return_1m"]))),
-                "return_3m":  self._parse_return(row.get(find_col(best_df, col_patterns["return_3m"]))),
-                "return_6m":  self._parse_return(row.get(find_col(best_df, col_patterns["return_6m"]))),
-                "return_1y":  self._parse_return(row.get(find_col(best_df, col_patterns["return_1y"]))),
+                "week_date":  week_iso,
+                "return_1m":  r1m,
+                "return_3m":  r3m,
+                "return_6m":  r6m,
+                "return_1y":  r1y,
                 "return_3y":  None,
             })
         logger.info(f"  ✓ HTML: {sector_code} → {len(results)} funds")
@@ -273,27 +356,90 @@ class TrustnetScraper:
             logger.warning(f"API failed ({e}), trying HTML scrape…")
             return self.fetch_sector_html(sector_code, week_date)
 
-    def fetch_monitored_sectors(self, week_date: date = None) -> tuple[dict, dict]:
-        """Fetch all monitored sectors. Returns (results, errors)."""
-        cfg = load_config()
+    async def _aget(self, client, url, params=None):
+        """Async twin of _get, with the same retry policy as the sync adapter."""
+        import httpx
+        for attempt in range(1, self.retries + 1):
+            try:
+                r = await client.get(url, params=params)
+                r.raise_for_status()
+                return r
+            except httpx.HTTPError as e:
+                resp = getattr(e, "response", None)
+                if attempt == self.retries or (resp is not None and resp.status_code not in self.RETRY_STATUSES):
+                    raise
+                after = resp.headers.get("Retry-After", "") if resp is not None else ""
+                wait = float(after) if after.isdigit() else self.backoff * 2 ** (attempt - 1)
+                logger.warning(f"Attempt {attempt}/{self.retries} failed: {e} — retrying in {wait:.1f}s")
+                await asyncio.sleep(wait)
+
+    async def _fetch_sector_async(self, client, sem: asyncio.Semaphore,
+                                  sector_code: str, week_date: date) -> list[dict]:
+        """fetch_sector over httpx: API candidates first, HTML scrape (in a thread) as fallback."""
+        params = self._api_params(sector_code)
+        # The slot covers the API requests and the politeness delay; only the
+        # threaded HTML fallback runs after it's released
+        async with sem:
+            for api_url in self._api_urls():
+                try:
+                    resp = await self._aget(client, api_url, params=params)
+                    if "application/json" in resp.headers.get("Content-Type", ""):
+                        data = parse_lazy(resp.content)
+                        results = self._parse_api_response(data, sector_code, week_date)
+                        del data    # all tasks share this thread's parser
+                        if results:
+                            logger.info(f"  ✓ API: {sector_code} → {len(results)} funds")
+                            self._good_api_url = api_url
+                            # Held through the delay, so at most max_conc requests overlap
+                            await asyncio.sleep(self.delay)
+                            return results
+                except Exception as e:
+                    logger.debug(f"  API {api_url} failed: {e}")
+        logger.warning(f"API failed for {sector_code}, trying HTML scrape…")
+        return await asyncio.to_thread(self.fetch_sector_html, sector_code, week_date)
+
+    async def fetch_monitored_sectors_async(self, week_date: date = None) -> tuple[dict, dict]:
+        """Fetch all monitored sectors concurrently. Returns (results, errors)."""
+        import httpx
+        _, _, monitored = load_sectors()
         if week_date is None:
             week_date = date.today()
-        monitored = [s for s in cfg["sectors"] if s.get("monitored")]
+        # httpx negotiates its own encodings and keep-alive
+        headers = {k: v for k, v in self.session.headers.items()
+                   if k not in ("Accept-Encoding", "Connection")}
+        sem = asyncio.Semaphore(self.max_conc)
+        async with httpx.AsyncClient(headers=headers, timeout=self.timeout, follow_redirects=True,
+                                     http2=find_spec("h2") is not None,
+                                     limits=httpx.Limits(max_connections=8)) as client:
+            outcomes = await asyncio.gather(
+                *(self._fetch_sector_async(client, sem, s["code"], week_date) for s in monitored),
+                return_exceptions=True)
         results, errors = {}, {}
-        for s in monitored:
-            try:
-                data = self.fetch_sector(s["code"], week_date)
-                results[s["code"]] = data
-            except Exception as e:
-                logger.error(f"FAILED {s['name']}: {e}")
-                errors[s["code"]] = str(e)
+        for s, out in zip(monitored, outcomes):
+            if isinstance(out, BaseException):
+                logger.error(f"FAILED {s['name']}: {out}")
+                errors[s["code"]] = str(out)
+            else:
+                results[s["code"]] = out
         return results, errors
 
+    def fetch_monitored_sectors(self, week_date: date = None) -> tuple[dict, dict]:
+        """
+        Fetch all monitored sectors. Returns (results, errors).
+        Sync entry point only — async callers await fetch_monitored_sectors_async().
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.fetch_monitored_sectors_async(week_date))
+        raise RuntimeError("fetch_monitored_sectors() called from a running event loop; "
+                           "await fetch_monitored_sectors_async() instead")
+
 
 # ── Realistic mock data for IA Unit Trusts & OEICs ───────────────────────────
 
 IA_FUND_NAMES = {
-    "IA UK All Companies": [
+    "IA UK All Companies": (
         "Liontrust Special Situations","Fidelity Special Situations","Artemis UK Select",
         "Schroder Recovery","Jupiter UK Special Situations","Man GLG UK Income",
         "Invesco UK Equity High Income","JOHCM UK Equity Income","Trojan Income",
@@ -302,16 +448,16 @@ IA_FUND_NAMES = {
         "Ninety One UK Alpha","Aviva Investors UK Listed Equity","abrdn UK Opportunities",
         "BNY Mellon UK Income","Dimensional UK Core Equity","L&G UK Index","Vanguard FTSE UK All Share",
         "iShares UK Equity Index","HSBC FTSE All Share Index","Fidelity Index UK",
-    ],
-    "IA UK Equity Income": [
+    ),
+    "IA UK Equity Income": (
         "City of London Equity","Murray Income","Edinburgh Investment","Law Debenture",
         "Trojan Income","Evenlode Income","Royal London UK Equity Income","Man GLG UK Income",
         "Schroder Income","Invesco UK Equity High Income","JOHCM UK Equity Income",
         "Finsbury Growth & Income","Perpetual Income & Growth","Henderson UK Equity Income",
         "Artemis Income","M&G Dividend","Standard Life UK Equity Income Unconstrained",
         "Dimensional UK Targeted Value","Vanguard FTSE UK Equity Income Index","iShares UK Dividend",
-    ],
-    "IA Global": [
+    ),
+    "IA Global": (
         "Fundsmith Equity","Baillie Gifford Global Discovery","Scottish Mortgage (OEIC)",
         "Rathbone Global Opportunities","Morgan Stanley Global Brands","Artemis Global Income",
         "Ninety One Global Special Situations","Liontrust Global Growth","Fidelity Global Focus",
@@ -323,16 +469,16 @@ IA_FUND_NAMES = {
         "Comgest Growth World","Guardcap Global Equity","Veritas Global Real Return",
         "Blue Whale Growth","GQG Partners Global Equity","Nomura Global High Conviction",
         "WS Montanaro Global Select","Trojan Global Income","Schroder QEP Global Active Value",
-    ],
-    "IA Global Equity Income": [
+    ),
+    "IA Global Equity Income": (
         "Artemis Global Income","Murray International","JPMorgan Global Equity Income",
         "Fidelity Global Dividend","Guinness Global Equity Income","M&G Global Dividend",
         "Newton Global Income","Investec Global Quality Equity Income","Evenlode Global Income",
         "Royal London Global Equity Income","Schroder Global Equity Income",
         "Dimensional Global Targeted Value","Vanguard FTSE All-World High Dividend Yield",
         "WisdomTree Global Quality Dividend Growth","WS Canaccord Genuity Global Eq Income",
-    ],
-    "IA Global Emerging Markets": [
+    ),
+    "IA Global Emerging Markets": (
         "Stewart Investors Global Emerging Markets Leaders","Fidelity Emerging Markets",
         "GQG Partners Emerging Markets Equity","Ninety One Global Special Situations",
         "Genesis Emerging Markets","Aubrey Global Emerging Markets Opportunities",
@@ -342,8 +488,8 @@ IA_FUND_NAMES = {
         "Comgest Growth Emerging Markets","Coronation Global Emerging Markets",
         "Somerset Emerging Markets Dividend Growth","GS Emerging Markets CORE Equity",
         "RWC Global Emerging Markets","Fundsmith Emerging Equities Trust (OEIC)",
-    ],
-    "IA UK Smaller Companies": [
+    ),
+    "IA UK Smaller Companies": (
         "Liontrust UK Micro Cap","Marlborough Multi Cap Income","Slater Growth",
         "Octopus UK Micro Cap Growth","Miton UK Multi Cap Income","abrdn UK Smaller Companies",
         "Gresham House UK Multi Cap Income","Unicorn UK Income","Threadneedle UK Smaller Companies",
@@ -353,8 +499,8 @@ IA_FUND_NAMES = {
         "TB Amati UK Smaller Companies","Canaccord Genuity UK Smaller Companies",
         "Gresham House UK Smaller Cos","WS Canaccord Genuity UK Smaler Cos",
         "Chelverton UK Equity Income","Chelverton UK Equity Growth",
-    ],
-    "IA North America": [
+    ),
+    "IA North America": (
         "Baillie Gifford American","Vanguard US Equity Index","HSBC American Index",
         "Fidelity Index US","L&G US Index","iShares US Equity Index",
         "Royal London US Growth","Brown Advisory US Equity Growth","Natixis Loomis Sayles US Equity Leaders",
@@ -364,8 +510,8 @@ IA_FUND_NAMES = {
         "Neuberger Berman US Multi Cap Opportunities","Polen Capital Focus US Growth",
         "Guinness US Equity Income","Brown Advisory US Sustainable Growth",
         "Gabelli US Fundamental Value","Findlay Park American","Hermes US SMID Equity",
-    ],
-    "IA Flexible Investment": [
+    ),
+    "IA Flexible Investment": (
         "Personal Assets Trust (OEIC)","Capital Gearing (OEIC)","Trojan",
         "Ruffer Total Return","VT Tatton Global Adventurous","Premier Miton Diversified Growth",
         "Jupiter Merlin Growth Portfolio","Schroder Multi-Asset Total Return",
@@ -373,8 +519,8 @@ IA_FUND_NAMES = {
         "BNY Mellon Multi-Asset Balanced","Artemis Monthly Distribution","VT AJ Bell Adventurous",
         "WS Canaccord Genuity Balanced","Vanguard LifeStrategy 80% Equity",
         "HSBC Global Strategy Balanced","Dimensional Global Allocation",
-    ],
-    "IA Mixed Investment 40-85% Shares": [
+    ),
+    "IA Mixed Investment 40-85% Shares": (
         "Vanguard LifeStrategy 60% Equity","HSBC Global Strategy Balanced",
         "Fidelity Multi Asset Allocator Balanced","L&G Multi-Index 5","Dimensional 60-40 Global",
         "Royal London Sustainable Diversified","Schroder MM Diversity","BNY Mellon Multi-Asset Growth",
@@ -383,8 +529,8 @@ IA_FUND_NAMES = {
         "WS Canaccord Genuity Balanced","Baillie Gifford Managed","Aviva Investors Multi-Asset Core 5",
         "AXA Framlington Managed Balanced","MI Downing Fox Balanced",
         "Margetts Aries Strategy","Hargreaves Lansdown Multi-Manager Balanced Managed",
-    ],
-    "IA Sterling Strategic Bond": [
+    ),
+    "IA Sterling Strategic Bond": (
         "Artemis Strategic Bond","M&G Strategic Corporate Bond","Royal London Strategic Bond",
         "TwentyFour Dynamic Bond","Rathbone Ethical Bond","Jupiter Strategic Bond",
         "Invesco Tactical Bond","Baillie Gifford Strategic Bond","Schroder Strategic Credit",
@@ -392,60 +538,77 @@ IA_FUND_NAMES = {
         "iShares Corporate Bond Index","HSBC Sterling Bond","Fidelity Strategic Bond",
         "Aviva Investors Strategic Bond","Axa Framlington Strategic Bond",
         "GAM Star Credit Opportunities","Kames Strategic Bond",
-    ],
-    "IA Infrastructure": [
+    ),
+    "IA Infrastructure": (
         "First Sentier Global Listed Infrastructure","Legg Mason IF Rare Infrastructure Income",
         "ATLAS Infrastructure","RARE Infrastructure Income","Vanguard FTSE All-World",
         "iShares Global Infrastructure","L&G Global Infrastructure Index",
         "BlackRock Natural Resources Growth & Income","Schroder Global Energy Transition",
         "Lazard Global Listed Infrastructure Equity","Cohen & Steers Global Listed Infrastructure",
-    ],
+    ),
 }
 
+
+def _mock_isin(name: str) -> str:
+    # blake2b rather than hash(): str hashes are salted per process (PYTHONHASHSEED)
+    return f"GB{int.from_bytes(blake2b(name.encode(), digest_size=5).digest(), 'big') % 10**10:010d}"
+
+
+def _mock_funds(names) -> tuple[tuple[str, str, str, str], ...]:
+    """(name, fund_group, isin, fund_id) for each mock fund name."""
+    return tuple((name, name.split()[0], isin, make_fund_id(name, isin))
+                 for name in names for isin in (_mock_isin(name),))
+
+
+# Built once at import: generate_mock_data only has to draw the returns
+_SECTOR_FUNDS = {sector: _mock_funds(names) for sector, names in IA_FUND_NAMES.items()}
+
+# Mock return distributions: (mean, sigma) per period, 1m → 3y
+_MOCK_PERIODS = ("return_1m", "return_3m", "return_6m", "return_1y", "return_3y")
+_MOCK_MU      = np.array([0.9, 3.2, 7.0, 12.0, 22.0])
+_MOCK_SIGMA   = np.array([3.5, 6.0, 11.0, 14.0, 18.0])
+
+
 def generate_mock_data(sector_code: str, week_date: date, prev_data: list[dict] = None) -> list[dict]:
     """
     Generate realistic IA Unit Trust mock data.
     If prev_data is given, applies a small weekly drift for realism.
     """
-    rng = random.Random(hash(sector_code + week_date.isoformat()) % 999983)
+    sector_code, week_iso = sys.intern(sector_code), sys.intern(week_date.isoformat())
+    seed = blake2b(f"{sector_code}{week_iso}".encode(), digest_size=8).digest()
+    rng = np.random.default_rng(int.from_bytes(seed, "big"))
 
-    # Get fund names for this sector, fall back to generic
-    names = IA_FUND_NAMES.get(sector_code, [])
-    if not names:
+    # Get funds for this sector, fall back to generic
+    funds = _SECTOR_FUNDS.get(sector_code)
+    if not funds:
         # Generic names for sectors without templates
         n = 18
-        names = [f"{sector_code.split('IA ')[-1]} Fund {i+1}" for i in range(n)]
+        funds = _mock_funds(f"{sector_code.split('IA ')[-1]} Fund {i+1}" for i in range(n))
 
     prev_map = {p["fund_name"]: p for p in (prev_data or [])}
 
-    results = []
-    for name in names:
-        prev = prev_map.get(name, {})
-        # Drift from previous week or generate fresh
-        def drift(old, mu, sigma):
-            if old is not None:
-                return round(old + rng.gauss(0, sigma * 0.25), 2)
-            return round(rng.gauss(mu, sigma), 2)
-
-        isin = f"GB{abs(hash(name)) % 10**10:010d}"
-        r6m = drift(prev.get("return_6m"), 7.0, 11.0)
-        r3m = drift(prev.get("return_3m"), 3.2, 6.0)
-        r1m = drift(prev.get("return_1m"), 0.9, 3.5)
-        r1y = drift(prev.get("return_1y"), 12.0, 14.0)
+    # Drift a quarter-sigma from last week's value where there is one (3y is
+    # always fresh), else draw around the period mean — one draw for all funds
+    old = np.array([[prev_map.get(f[0], {}).get(k) for k in _MOCK_PERIODS[:4]] + [None]
+                    for f in funds], dtype=float).reshape(len(funds), len(_MOCK_PERIODS))
+    fresh = np.isnan(old)
+    draws = rng.normal(np.where(fresh, _MOCK_MU, old), _MOCK_SIGMA * np.where(fresh, 1.0, 0.25))
 
+    results = []
+    for (name, group, isin, fund_id), (r1m, r3m, r6m, r1y, r3y) in zip(funds, np.round(draws, 2).tolist()):
         results.append({
-            "fund_id":    make_fund_id(name, isin),
+            "fund_id":    fund_id,
             "fund_name":  name,
             "isin":       isin,
             "sedol":      None,
-            "fund_group": name.split()[0],
+            "fund_group": group,
             "sector_code": sector_code,
-            "week_date":  week_date.isoformat(),
+            "week_date":  week_iso,
             "return_1m":  r1m,
             "return_3m":  r3m,
             "return_6m":  r6m,
             "return_1y":  r1y,
-            "return_3y":  drift(None, 22.0, 18.0),
+            "return_3y":  r3y,
         })
 
     return results